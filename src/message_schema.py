@@ -3,11 +3,18 @@ WebSocket Message Schema for io-speech streaming
 
 Defines message types for bidirectional audio streaming, VAD events,
 transcription, and barge-in support.
+
+Audio can also be sent as binary WebSocket frames (see AudioInputFrame),
+which carry raw PCM16 without the base64/JSON overhead.
 """
 
-from typing import Literal, Optional, Union
-from pydantic import BaseModel, Field
-from datetime import datetime
+import struct
+import time
+from dataclasses import dataclass
+from typing import Annotated, Literal, Optional, Union, get_args
+from pydantic import Base64Bytes, BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+import orjson
+import pybase64
 
 
 # ============================================================================
@@ -16,14 +23,18 @@ from datetime import datetime
 
 class AudioInputMessage(BaseModel):
     """Audio data from client (PCM16, 16kHz, mono)"""
+    model_config = ConfigDict(frozen=True)
+    
     type: Literal["audio"] = "audio"
-    data: str = Field(..., description="Base64-encoded PCM16 audio data")
+    data: Base64Bytes = Field(..., description="Base64-encoded PCM16 audio data (decoded on validation)")
     timestamp: int = Field(..., description="Client timestamp in milliseconds")
     sequence: int = Field(..., description="Sequence number for ordering")
 
 
 class ControlMessage(BaseModel):
     """Control commands from client"""
+    model_config = ConfigDict(frozen=True)
+    
     type: Literal["control"] = "control"
     action: Literal["start_listening", "stop_listening", "cancel_tts"] = Field(
         ..., description="Control action to perform"
@@ -31,65 +42,105 @@ class ControlMessage(BaseModel):
     timestamp: Optional[int] = Field(None, description="Client timestamp in milliseconds")
 
 
-# Union type for all client messages
-ClientMessage = Union[AudioInputMessage, ControlMessage]
+@dataclass(slots=True, frozen=True)
+class AudioInputFrame:
+    """
+    Binary audio frame from client (PCM16, 16kHz, mono)
+    
+    Layout (little-endian): uint8 tag (AUDIO_FRAME_TAG), uint32 sequence,
+    uint64 client timestamp in milliseconds, then raw PCM16 samples.
+    """
+    sequence: int
+    timestamp: int
+    pcm: memoryview
+
+
+AUDIO_FRAME_TAG = 0x01
+AUDIO_FRAME_HEADER = struct.Struct("<BIQ")
+
+
+# Union type for all client messages, discriminated on "type"
+ClientMessage = Annotated[Union[AudioInputMessage, ControlMessage], Field(discriminator="type")]
 
 
 # ============================================================================
 # Server → Client Messages
 # ============================================================================
 
-class TranscriptMessage(BaseModel):
+# Server messages are built by trusted code only, so they are plain slotted
+# dataclasses (no validation) that orjson serializes natively
+
+StatusValue = Literal["connected", "listening", "processing", "speaking"]
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class OutboundMessage:
+    """Base for server messages"""
+    
+    def as_bytes(self) -> bytes:
+        """Serialize to UTF-8 JSON"""
+        return orjson.dumps(self)
+
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class TranscriptMessage(OutboundMessage):
     """Transcription result (partial or final)"""
+    
     type: Literal["transcript"] = "transcript"
-    text: str = Field(..., description="Transcribed text")
-    is_final: bool = Field(..., description="True if final transcript, False if partial")
-    confidence: float = Field(..., ge=0.0, le=1.0, description="Confidence score")
-    timestamp: int = Field(..., description="Server timestamp in milliseconds")
+    text: str  # Transcribed text
+    is_final: bool  # True if final transcript, False if partial
+    confidence: float  # Confidence score (0.0-1.0)
+    timestamp: int  # Server timestamp in milliseconds
 
 
-class VADEventMessage(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class VADEventMessage(OutboundMessage):
     """Voice Activity Detection event"""
+    
     type: Literal["vad"] = "vad"
-    event: Literal["speech_start", "speech_end"] = Field(
-        ..., description="VAD event type"
-    )
-    timestamp: int = Field(..., description="Server timestamp in milliseconds")
-    energy: Optional[float] = Field(None, description="Audio energy level")
+    event: Literal["speech_start", "speech_end"]  # VAD event type
+    timestamp: int  # Server timestamp in milliseconds
+    energy: Optional[float] = None  # Audio energy level
 
 
-class AudioOutputMessage(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class AudioOutputMessage(OutboundMessage):
     """TTS audio output"""
+    
     type: Literal["audio_output"] = "audio_output"
-    data: str = Field(..., description="Base64-encoded audio data")
-    format: str = Field(default="pcm16", description="Audio format")
-    sample_rate: int = Field(default=16000, description="Sample rate in Hz")
-    sequence: int = Field(..., description="Sequence number for ordering")
-    timestamp: int = Field(..., description="Server timestamp in milliseconds")
+    data: str  # Base64-encoded audio data
+    format: str = "pcm16"  # Audio format
+    sample_rate: int = 16000  # Sample rate in Hz
+    sequence: int  # Sequence number for ordering
+    timestamp: int  # Server timestamp in milliseconds
 
 
-class BargeInMessage(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class BargeInMessage(OutboundMessage):
     """Barge-in notification (TTS cancelled)"""
+    
     type: Literal["barge_in"] = "barge_in"
-    cancelled_sequence: int = Field(..., description="Sequence number of cancelled TTS")
-    timestamp: int = Field(..., description="Server timestamp in milliseconds")
+    cancelled_sequence: int  # Sequence number of cancelled TTS
+    timestamp: int  # Server timestamp in milliseconds
 
 
-class ErrorMessage(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class ErrorMessage(OutboundMessage):
     """Error notification"""
+    
     type: Literal["error"] = "error"
-    code: str = Field(..., description="Error code")
-    message: str = Field(..., description="Human-readable error message")
-    timestamp: int = Field(..., description="Server timestamp in milliseconds")
+    code: str  # Error code
+    message: str  # Human-readable error message
+    timestamp: int  # Server timestamp in milliseconds
 
 
-class StatusMessage(BaseModel):
+@dataclass(slots=True, frozen=True, kw_only=True)
+class StatusMessage(OutboundMessage):
     """Connection status update"""
+    
     type: Literal["status"] = "status"
-    status: Literal["connected", "listening", "processing", "speaking"] = Field(
-        ..., description="Current connection status"
-    )
-    timestamp: int = Field(..., description="Server timestamp in milliseconds")
+    status: StatusValue  # Current connection status
+    timestamp: int  # Server timestamp in milliseconds
 
 
 # Union type for all server messages
@@ -109,19 +160,64 @@ ServerMessage = Union[
 
 def get_timestamp_ms() -> int:
     """Get current timestamp in milliseconds"""
-    return int(datetime.now().timestamp() * 1000)
+    return time.time_ns() // 1_000_000
+
+
+_CLIENT_MESSAGE_ADAPTER = TypeAdapter(ClientMessage)
+_UNKNOWN_TAG_ERRORS = ("union_tag_invalid", "union_tag_not_found")
 
 
 def parse_client_message(data: dict) -> ClientMessage:
     """Parse incoming client message"""
-    msg_type = data.get("type")
+    # Discriminated union: pydantic-core selects the model from the type tag,
+    # so the type is only inspected in Python when validation fails
+    try:
+        return _CLIENT_MESSAGE_ADAPTER.validate_python(data)
+    except ValidationError as e:
+        if e.errors()[0]["type"] in _UNKNOWN_TAG_ERRORS:
+            raise ValueError(f"Unknown message type: {data.get('type')}") from None
+        raise
+
+
+def parse_audio_frame(frame: bytes) -> AudioInputFrame:
+    """Parse a binary audio frame (header + raw PCM16, no copy of the PCM)"""
+    if len(frame) < AUDIO_FRAME_HEADER.size:
+        raise ValueError("Binary frame too short for audio header")
     
-    if msg_type == "audio":
-        return AudioInputMessage(**data)
-    elif msg_type == "control":
-        return ControlMessage(**data)
-    else:
-        raise ValueError(f"Unknown message type: {msg_type}")
+    tag, sequence, timestamp = AUDIO_FRAME_HEADER.unpack_from(frame)
+    if tag != AUDIO_FRAME_TAG:
+        raise ValueError(f"Unknown binary frame tag: {tag}")
+    
+    return AudioInputFrame(
+        sequence=sequence,
+        timestamp=timestamp,
+        pcm=memoryview(frame)[AUDIO_FRAME_HEADER.size:]
+    )
+
+
+def decode_audio_payload(data: dict) -> bytes:
+    """Decode the audio of a raw "audio" message dict, skipping model validation"""
+    payload = data.get("data")
+    if not isinstance(payload, str):
+        raise ValueError("Audio message requires a base64 'data' string")
+    return pybase64.b64decode(payload)
+
+
+def create_audio_frame(pcm: bytes, sequence: int, timestamp: int) -> bytes:
+    """Create a binary audio frame (client side / testing)"""
+    return AUDIO_FRAME_HEADER.pack(AUDIO_FRAME_TAG, sequence, timestamp) + pcm
+
+
+def serialize_message(message: OutboundMessage) -> bytes:
+    """Serialize a message to UTF-8 JSON for a WebSocket text frame"""
+    return message.as_bytes()
+
+
+def serialize_batch(payloads: list[bytes]) -> bytes:
+    """Combine serialized messages into one frame (single messages pass through)"""
+    if len(payloads) == 1:
+        return payloads[0]
+    return b'{"type":"batch","messages":[' + b",".join(payloads) + b"]}"
 
 
 def create_transcript_message(
@@ -138,6 +234,21 @@ def create_transcript_message(
     )
 
 
+# Only the variable fields are encoded; the fixed keys stay pre-serialized
+# without building a dict per transcript
+_TRANSCRIPT_TEMPLATE = b'{"type":"transcript","text":%s,"is_final":%s,"confidence":%s,"timestamp":%d}'
+
+
+def serialize_transcript_message(text: str, is_final: bool, confidence: float = 0.95) -> bytes:
+    """Serialize a transcript message without building a message object"""
+    return _TRANSCRIPT_TEMPLATE % (
+        orjson.dumps(text),
+        b"true" if is_final else b"false",
+        orjson.dumps(confidence),
+        get_timestamp_ms(),
+    )
+
+
 def create_vad_event(event: Literal["speech_start", "speech_end"], energy: Optional[float] = None) -> VADEventMessage:
     """Create a VAD event message"""
     return VADEventMessage(
@@ -155,6 +266,19 @@ def create_barge_in_message(cancelled_sequence: int) -> BargeInMessage:
     )
 
 
+# Status messages only differ by status and timestamp, so the JSON prefix
+# for each status is serialized once up front
+_STATUS_PREFIXES = {
+    status: serialize_message(StatusMessage(status=status, timestamp=0)).removesuffix(b"0}")
+    for status in get_args(StatusValue)
+}
+
+
+def serialize_status_message(status: StatusValue) -> bytes:
+    """Serialize a status message without building a message object"""
+    return b"%s%d}" % (_STATUS_PREFIXES[status], get_timestamp_ms())
+
+
 def create_error_message(code: str, message: str) -> ErrorMessage:
     """Create an error message"""
     return ErrorMessage(
@@ -164,7 +288,7 @@ def create_error_message(code: str, message: str) -> ErrorMessage:
     )
 
 
-def create_status_message(status: Literal["connected", "listening", "processing", "speaking"]) -> StatusMessage:
+def create_status_message(status: StatusValue) -> StatusMessage:
     """Create a status message"""
     return StatusMessage(
         status=status,
@@ -176,19 +300,24 @@ def create_status_message(status: Literal["connected", "listening", "processing"
 # Message Validation
 # ============================================================================
 
+MAX_AUDIO_CHUNK_BYTES = 1024 * 1024  # Max 1MB per chunk
+
+
 def validate_audio_data(data: str) -> bool:
     """Validate base64-encoded audio data"""
-    import base64
+    # Check size from the encoded length before decoding anything
+    n = len(data)
+    if n == 0 or n % 4:
+        return False
+    padding = (data[-1] == "=") + (data[-2] == "=")
+    decoded_size = n // 4 * 3 - padding
+    if decoded_size > MAX_AUDIO_CHUNK_BYTES or not data.isascii():
+        return False
     try:
-        decoded = base64.b64decode(data)
-        # Check if length is reasonable (not empty, not too large)
-        if len(decoded) == 0:
-            return False
-        if len(decoded) > 1024 * 1024:  # Max 1MB per chunk
-            return False
-        return True
-    except Exception:
+        pybase64.b64decode(data, validate=True)
+    except ValueError:
         return False
+    return True
 
 
 def validate_audio_format(sample_rate: int, channels: int, format: str) -> bool:
@@ -122,4 +122,4 @@ def get_sessions(request: Request):
     }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8084)
+    uvicorn.run(app, host="0.0.0.0", port=8084, loop="uvloop", ws_per_message_deflate=False)
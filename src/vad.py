@@ -5,15 +5,29 @@ Simple energy-based VAD for detecting speech start/end.
 Can be upgraded to WebRTC VAD or ML-based VAD in the future.
 """
 
+import math
+import wave
 import numpy as np
-from typing import Literal, Optional
-from dataclasses import dataclass
+from collections import deque
+from typing import Literal, Optional, Sequence
+from dataclasses import dataclass, field, replace
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Sample dtype for each supported audio format; wire audio is little-endian,
+# so multi-byte formats are explicit about byte order
+_FORMAT_DTYPES = {
+    "pcm16": np.dtype("<i2"),
+    "pcm8": np.dtype(np.int8),
+    "float32": np.dtype("<f4"),
+}
 
-@dataclass
+# Shared result for the common case of a chunk with no VAD events
+_NO_EVENTS: tuple = ()
+
+
+@dataclass(slots=True, frozen=True)
 class VADConfig:
     """VAD configuration parameters"""
     energy_threshold: float = 0.01  # Energy threshold for speech detection
@@ -22,20 +36,16 @@ class VADConfig:
     sample_rate: int = 16000  # Audio sample rate
     frame_duration_ms: int = 30  # Frame duration for processing (ms)
     
-    @property
-    def frame_size(self) -> int:
-        """Calculate frame size in samples"""
-        return int(self.sample_rate * self.frame_duration_ms / 1000)
+    # Derived frame counts, computed once in __post_init__
+    frame_size: int = field(init=False, repr=False, compare=False)  # Frame size in samples
+    speech_pad_frames: int = field(init=False, repr=False, compare=False)  # Speech padding in frames
+    silence_frames: int = field(init=False, repr=False, compare=False)  # Silence duration in frames
     
-    @property
-    def speech_pad_frames(self) -> int:
-        """Calculate speech padding in frames"""
-        return int(self.speech_pad_ms / self.frame_duration_ms)
-    
-    @property
-    def silence_frames(self) -> int:
-        """Calculate silence duration in frames"""
-        return int(self.silence_duration_ms / self.frame_duration_ms)
+    def __post_init__(self):
+        # Frozen dataclass: derived fields are set through object.__setattr__
+        object.__setattr__(self, "frame_size", self.sample_rate * self.frame_duration_ms // 1000)
+        object.__setattr__(self, "speech_pad_frames", self.speech_pad_ms // self.frame_duration_ms)
+        object.__setattr__(self, "silence_frames", self.silence_duration_ms // self.frame_duration_ms)
 
 
 class VoiceActivityDetector:
@@ -46,13 +56,25 @@ class VoiceActivityDetector:
     Uses a simple state machine with hysteresis to avoid false triggers.
     """
     
+    __slots__ = (
+        "config", "state", "speech_frames", "silence_frames",
+        "max_history_size", "energy_history",
+        "_frame_size", "_speech_pad_frames", "_silence_frames_limit",
+    )
+    
     def __init__(self, config: Optional[VADConfig] = None):
         self.config = config or VADConfig()
         self.state: Literal["silence", "speech"] = "silence"
         self.speech_frames = 0
         self.silence_frames = 0
-        self.energy_history = []
         self.max_history_size = 100
+        self.energy_history: deque[float] = deque(maxlen=self.max_history_size)
+        
+        # Frame counts are fixed for the lifetime of the config; cache them
+        # so the per-frame path reads the detector's own slots
+        self._frame_size = self.config.frame_size
+        self._speech_pad_frames = self.config.speech_pad_frames
+        self._silence_frames_limit = self.config.silence_frames
         
         logger.info(
             f"VAD initialized: threshold={self.config.energy_threshold}, "
@@ -70,18 +92,37 @@ class VoiceActivityDetector:
         Returns:
             RMS energy value
         """
-        if len(audio_data) == 0:
+        n = len(audio_data)
+        if n == 0:
             return 0.0
         
-        # Convert to float if needed
-        if audio_data.dtype == np.int16:
-            audio_float = audio_data.astype(np.float32) / 32768.0
-        else:
-            audio_float = audio_data.astype(np.float32)
+        # Single cast, then a fused multiply-accumulate; PCM16 is scaled
+        # once on the scalar result instead of per sample
+        audio_float = audio_data.astype(np.float32, copy=False)
+        energy = math.sqrt(float(np.dot(audio_float, audio_float)) / n)
+        if audio_data.dtype.char == "h":  # int16, either byte order
+            energy /= 32768.0
+        return energy
+    
+    def calculate_frame_energies(self, frames: np.ndarray) -> np.ndarray:
+        """
+        Calculate RMS energy of every frame in a block
+        
+        Args:
+            frames: Audio samples shaped (n_frames, frame_size)
         
-        # Calculate RMS energy
-        energy = np.sqrt(np.mean(audio_float ** 2))
-        return float(energy)
+        Returns:
+            RMS energy per frame
+        """
+        # One cast and one multiply-accumulate pass over the whole block;
+        # the rest runs in place on einsum's output
+        frames_float = frames.astype(np.float32, copy=False)
+        energies = np.einsum("ij,ij->i", frames_float, frames_float)
+        energies /= frames.shape[1]
+        np.sqrt(energies, out=energies)
+        if frames.dtype.char == "h":  # int16, either byte order
+            energies /= 32768.0
+        return energies
     
     def process_frame(self, audio_data: np.ndarray) -> Optional[Literal["speech_start", "speech_end"]]:
         """
@@ -93,45 +134,108 @@ class VoiceActivityDetector:
         Returns:
             VAD event if state changed, None otherwise
         """
-        energy = self.calculate_energy(audio_data)
-        
-        # Store energy history for adaptive thresholding
-        self.energy_history.append(energy)
-        if len(self.energy_history) > self.max_history_size:
-            self.energy_history.pop(0)
-        
-        # Determine if frame contains speech
-        is_speech = energy > self.config.energy_threshold
-        
-        event = None
-        
-        if self.state == "silence":
-            if is_speech:
-                self.speech_frames += 1
-                if self.speech_frames >= self.config.speech_pad_frames:
-                    # Transition to speech
-                    self.state = "speech"
-                    self.silence_frames = 0
-                    event = "speech_start"
-                    logger.debug(f"Speech started (energy={energy:.4f})")
-            else:
-                self.speech_frames = 0
+        return self.update(self.calculate_energy(audio_data))
+    
+    def update(self, energy: float) -> Optional[Literal["speech_start", "speech_end"]]:
+        """
+        Advance the VAD state machine with one frame's energy
+        
+        Args:
+            energy: RMS energy of the frame
+        
+        Returns:
+            VAD event if state changed, None otherwise
+        """
+        events = self.process_energies((energy,))
+        return events[0] if events else None
+    
+    def process_energies(self, energies: Sequence[float]) -> Sequence[Literal["speech_start", "speech_end"]]:
+        """
+        Advance the VAD state machine over consecutive frame energies
         
-        elif self.state == "speech":
-            if not is_speech:
-                self.silence_frames += 1
-                if self.silence_frames >= self.config.silence_frames:
-                    # Transition to silence
-                    self.state = "silence"
-                    self.speech_frames = 0
-                    event = "speech_end"
-                    logger.debug(f"Speech ended (silence={self.silence_frames} frames)")
-            else:
+        Args:
+            energies: RMS energy of each frame, in order
+        
+        Returns:
+            List of VAD events, in order
+        """
+        # Store energy history for adaptive thresholding (bounded by maxlen)
+        self.energy_history.extend(energies)
+        
+        threshold = self.config.energy_threshold
+        state = self.state
+        
+        # Fast path: a chunk that stays entirely on the current side of the
+        # threshold only resets the opposing counter, so skip the loop
+        if energies:
+            if state == "silence" and max(energies) <= threshold:
+                self.speech_frames = 0
+                return _NO_EVENTS
+            if state == "speech" and min(energies) > threshold:
                 self.silence_frames = 0
+                return _NO_EVENTS
+        
+        # Run the state machine on locals and write back once at the end
+        speech_frames = self.speech_frames
+        silence_frames = self.silence_frames
+        
+        # Events are rare, so the list is only allocated once one fires
+        events = None
+        
+        for energy in energies:
+            # Determine if frame contains speech
+            is_speech = energy > threshold
+            
+            if state == "silence":
+                if is_speech:
+                    speech_frames += 1
+                    if speech_frames >= self._speech_pad_frames:
+                        # Transition to speech
+                        state = "speech"
+                        silence_frames = 0
+                        if events is None:
+                            events = []
+                        events.append("speech_start")
+                        logger.debug("Speech started (energy=%.4f)", energy)
+                else:
+                    speech_frames = 0
+            
+            elif state == "speech":
+                if not is_speech:
+                    silence_frames += 1
+                    if silence_frames >= self._silence_frames_limit:
+                        # Transition to silence
+                        state = "silence"
+                        speech_frames = 0
+                        if events is None:
+                            events = []
+                        events.append("speech_end")
+                        logger.debug("Speech ended (silence=%d frames)", silence_frames)
+                else:
+                    silence_frames = 0
+        
+        self.state = state
+        self.speech_frames = speech_frames
+        self.silence_frames = silence_frames
+        return events or _NO_EVENTS
+    
+    def process_frames(self, frames: np.ndarray) -> Sequence[Literal["speech_start", "speech_end"]]:
+        """
+        Process a block of equal-length frames and return all VAD events
+        
+        Args:
+            frames: Audio samples shaped (n_frames, frame_len), or a single 1D frame
         
-        return event
+        Returns:
+            List of VAD events, in order
+        """
+        if frames.ndim == 1:
+            frames = frames.reshape(1, -1)
+        if frames.shape[1] == 0:
+            return self.process_energies([0.0] * frames.shape[0])
+        return self.process_energies(self.calculate_frame_energies(frames).tolist())
     
-    def process_chunk(self, audio_chunk: bytes, format: str = "pcm16") -> list[Literal["speech_start", "speech_end"]]:
+    def process_chunk(self, audio_chunk: bytes, format: str = "pcm16") -> Sequence[Literal["speech_start", "speech_end"]]:
         """
         Process audio chunk and return all VAD events
         
@@ -143,37 +247,37 @@ class VoiceActivityDetector:
             List of VAD events detected in this chunk
         """
         # Convert bytes to numpy array
-        if format == "pcm16":
-            audio_data = np.frombuffer(audio_chunk, dtype=np.int16)
-        elif format == "pcm8":
-            audio_data = np.frombuffer(audio_chunk, dtype=np.int8)
-        elif format == "float32":
-            audio_data = np.frombuffer(audio_chunk, dtype=np.float32)
-        else:
-            raise ValueError(f"Unsupported audio format: {format}")
+        try:
+            dtype = _FORMAT_DTYPES[format]
+        except KeyError:
+            raise ValueError(f"Unsupported audio format: {format}") from None
+        audio_data = np.frombuffer(audio_chunk, dtype=dtype)
         
-        # Process chunk in frames
-        events = []
-        frame_size = self.config.frame_size
+        frame_size = self._frame_size
+        n_frames = len(audio_data) // frame_size
         
-        for i in range(0, len(audio_data), frame_size):
-            frame = audio_data[i:i + frame_size]
-            if len(frame) < frame_size:
-                # Pad last frame if needed
-                frame = np.pad(frame, (0, frame_size - len(frame)), mode='constant')
-            
-            event = self.process_frame(frame)
-            if event:
-                events.append(event)
+        # Compute energies for all full frames at once, then run the
+        # state machine over the (small) energy vector in one call
+        if n_frames:
+            frames = audio_data[:n_frames * frame_size].reshape(n_frames, frame_size)
+            energies = self.calculate_frame_energies(frames).tolist()
+        else:
+            energies = []
         
-        return events
+        tail = audio_data[n_frames * frame_size:]
+        if len(tail):
+            # Zero-padding the last frame only enlarges the RMS divisor, so
+            # rescale the partial frame's energy instead of padding a copy
+            energies.append(self.calculate_energy(tail) * math.sqrt(len(tail) / frame_size))
+        
+        return self.process_energies(energies)
     
     def reset(self):
         """Reset VAD state"""
         self.state = "silence"
         self.speech_frames = 0
         self.silence_frames = 0
-        self.energy_history = []
+        self.energy_history.clear()
         logger.debug("VAD state reset")
     
     def get_state(self) -> Literal["silence", "speech"]:
@@ -184,11 +288,15 @@ class VoiceActivityDetector:
         """Check if currently in speech state"""
         return self.state == "speech"
     
+    def _history_array(self) -> np.ndarray:
+        """Copy energy history into an array (only for the rare stats paths)"""
+        return np.fromiter(self.energy_history, dtype=np.float32, count=len(self.energy_history))
+    
     def get_average_energy(self) -> float:
         """Get average energy from history"""
         if not self.energy_history:
             return 0.0
-        return float(np.mean(self.energy_history))
+        return float(np.mean(self._history_array()))
     
     def adapt_threshold(self, percentile: float = 75):
         """
@@ -200,12 +308,15 @@ class VoiceActivityDetector:
         if len(self.energy_history) < 10:
             return  # Need more history
         
-        new_threshold = float(np.percentile(self.energy_history, percentile))
+        # Quickselect the percentile element instead of fully sorting
+        history = self._history_array()
+        k = round((len(history) - 1) * percentile / 100)
+        new_threshold = float(np.partition(history, k)[k])
         
         # Only adapt if significantly different
         if abs(new_threshold - self.config.energy_threshold) > 0.005:
             old_threshold = self.config.energy_threshold
-            self.config.energy_threshold = new_threshold
+            self.config = replace(self.config, energy_threshold=new_threshold)
             logger.info(f"VAD threshold adapted: {old_threshold:.4f} → {new_threshold:.4f}")
 
 
@@ -247,8 +358,6 @@ def test_vad_with_audio(audio_file: str):
     Args:
         audio_file: Path to audio file (WAV format)
     """
-    import wave
-    
     with wave.open(audio_file, 'rb') as wf:
         sample_rate = wf.getframerate()
         n_channels = wf.getnchannels()
@@ -5,27 +5,47 @@ Handles bidirectional audio streaming, VAD events, and barge-in support.
 """
 
 import asyncio
-import base64
-import json
 import logging
+import time
+import orjson
+from collections import deque
 from typing import Optional
 from fastapi import WebSocket, WebSocketDisconnect
-from datetime import datetime
 
 from message_schema import (
     parse_client_message,
-    create_transcript_message,
+    parse_audio_frame,
+    decode_audio_payload,
+    serialize_message,
+    serialize_batch,
+    serialize_status_message,
+    serialize_transcript_message,
     create_vad_event,
     create_barge_in_message,
     create_error_message,
-    create_status_message,
-    AudioInputMessage,
     ControlMessage,
+    ServerMessage,
 )
 from vad import VoiceActivityDetector, VADConfig
 
 logger = logging.getLogger(__name__)
 
+# StreamingSession state flags (bits of StreamingSession._flags)
+_F_LISTENING = 1
+_F_SPEAKING = 2  # TTS playback
+_F_CLOSED = 4  # Writer stopped after a failed send; outbound messages are dropped
+
+# Minimum spacing between partial transcripts while speech continues
+PARTIAL_TRANSCRIPT_INTERVAL_S = 0.25
+
+# Cap on buffered utterance audio (30s of 16kHz PCM16); oldest chunks are
+# dropped beyond this so a session that never goes silent stays bounded
+MAX_UTTERANCE_BYTES = 30 * 16000 * 2
+
+# Outbound backlog above which the receive loop waits for the writer, so a
+# client that stops reading stalls its own input instead of growing the queue
+SEND_QUEUE_HIGH_WATER = 256 * 1024
+
 
 class StreamingSession:
     """
@@ -34,39 +54,163 @@ class StreamingSession:
     Handles audio input, VAD, transcription, and barge-in.
     """
     
-    def __init__(self, websocket: WebSocket, session_id: str):
+    __slots__ = (
+        "websocket", "session_id", "slot", "vad", "_flags",
+        "audio_chunks", "buffered_bytes", "sequence_counter", "tts_sequence",
+        "start_monotonic", "_last_partial_mono",
+        "_send_queue", "queued_bytes", "_send_waker", "_drain_waiter", "_writer_task",
+    )
+    
+    def __init__(self, websocket: WebSocket, session_id: int):
         self.websocket = websocket
         self.session_id = session_id
+        self.slot = -1  # Storage slot in WebSocketManager.sessions
         self.vad = VoiceActivityDetector(VADConfig())
-        self.is_listening = False
-        self.is_speaking = False  # TTS playback state
-        self.audio_buffer = bytearray()
+        self._flags = 0
+        # Utterance audio is kept as received chunks and only joined when
+        # STT needs contiguous bytes, avoiding bytearray regrowth copies
+        self.audio_chunks: deque[bytes] = deque()
+        self.buffered_bytes = 0
         self.sequence_counter = 0
         self.tts_sequence: Optional[int] = None
-        self.start_time = datetime.now()
+        self.start_monotonic = time.monotonic()
+        self._last_partial_mono = 0.0
+        
+        # Outbound messages are queued and drained by a writer task, so
+        # handlers never block on sends and bursts coalesce into one frame
+        self._send_queue: deque[bytes] = deque()
+        self.queued_bytes = 0
+        self._send_waker: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._writer_task: Optional[asyncio.Task] = None
         
-        logger.info(f"Session {session_id} created")
+        logger.info("Session %d created", session_id)
+    
+    @property
+    def is_listening(self) -> bool:
+        """Listening for user speech"""
+        return bool(self._flags & _F_LISTENING)
+    
+    @is_listening.setter
+    def is_listening(self, value: bool):
+        self._flags = self._flags | _F_LISTENING if value else self._flags & ~_F_LISTENING
+    
+    @property
+    def is_speaking(self) -> bool:
+        """TTS playback state"""
+        return bool(self._flags & _F_SPEAKING)
+    
+    @is_speaking.setter
+    def is_speaking(self, value: bool):
+        self._flags = self._flags | _F_SPEAKING if value else self._flags & ~_F_SPEAKING
+    
+    @property
+    def closed(self) -> bool:
+        """True once the writer has stopped because the connection failed"""
+        return bool(self._flags & _F_CLOSED)
     
-    async def send_message(self, message: dict):
+    def start(self):
+        """Start the session writer task"""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+    
+    async def close(self):
+        """Stop the session writer task"""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+    
+    async def drain(self):
+        """Wait until the writer has taken the outbound backlog (or failed)"""
+        loop = asyncio.get_running_loop()
+        while self.queued_bytes > SEND_QUEUE_HIGH_WATER and not self._flags & _F_CLOSED:
+            self._drain_waiter = loop.create_future()
+            await self._drain_waiter
+            self._drain_waiter = None
+    
+    async def send_message(self, message: ServerMessage):
         """Send message to client"""
-        try:
-            await self.websocket.send_json(message)
-        except Exception as e:
-            logger.error(f"Session {self.session_id}: Error sending message: {e}")
-            raise
+        self.queue_message(message)
+    
+    async def send_status(self, status: str):
+        """Send a status update to client"""
+        self.queue_status(status)
+    
+    def queue_message(self, message: ServerMessage):
+        """Queue message for the writer"""
+        self._enqueue(serialize_message(message))
+    
+    def queue_status(self, status: str):
+        """Queue a status update for the writer"""
+        self._enqueue(serialize_status_message(status))
+    
+    def queue_transcript(self, text: str, is_final: bool, confidence: float):
+        """Queue a transcript for the writer"""
+        self._enqueue(serialize_transcript_message(text, is_final, confidence))
     
-    async def handle_audio_input(self, message: AudioInputMessage):
+    def _enqueue(self, payload: bytes):
+        """Append a serialized message and wake the writer if it is idle"""
+        if self._flags & _F_CLOSED:
+            return
+        self._send_queue.append(payload)
+        self.queued_bytes += len(payload)
+        waker = self._send_waker
+        if waker is not None and not waker.done():
+            waker.set_result(None)
+    
+    def _wake_drain(self):
+        """Release a receive loop waiting in drain()"""
+        waiter = self._drain_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+    
+    async def _writer_loop(self):
+        """Drain queued messages, sending everything queued as one frame"""
+        loop = asyncio.get_running_loop()
+        queue = self._send_queue
+        while True:
+            if not queue:
+                self._send_waker = loop.create_future()
+                await self._send_waker
+                self._send_waker = None
+            
+            payload = serialize_batch(list(queue))
+            queue.clear()
+            self.queued_bytes = 0
+            self._wake_drain()
+            try:
+                await self.websocket.send_text(payload.decode())
+            except Exception as e:
+                logger.error("Session %d: Error sending message: %s", self.session_id, e)
+                # Stop accepting messages and close the socket so the
+                # receive loop sees a disconnect and ends the session
+                self._flags |= _F_CLOSED
+                queue.clear()
+                self.queued_bytes = 0
+                self._wake_drain()
+                try:
+                    await self.websocket.close()
+                except Exception:
+                    pass
+                return
+    
+    async def handle_audio(self, audio_bytes: bytes):
         """
-        Handle incoming audio data from client
+        Handle incoming PCM16 audio from client
         
         Processes audio through VAD and generates transcripts.
         """
         try:
-            # Decode audio data
-            audio_bytes = base64.b64decode(message.data)
-            
-            # Add to buffer
-            self.audio_buffer.extend(audio_bytes)
+            # Add to buffer, dropping the oldest audio past the cap
+            chunks = self.audio_chunks
+            chunks.append(audio_bytes)
+            self.buffered_bytes += len(audio_bytes)
+            while self.buffered_bytes > MAX_UTTERANCE_BYTES and len(chunks) > 1:
+                self.buffered_bytes -= len(chunks.popleft())
             
             # Process through VAD
             vad_events = self.vad.process_chunk(audio_bytes, format="pcm16")
@@ -74,103 +218,92 @@ class StreamingSession:
             # Send VAD events
             for event in vad_events:
                 vad_msg = create_vad_event(event, energy=self.vad.get_average_energy())
-                await self.send_message(vad_msg.dict())
+                self.queue_message(vad_msg)
                 
                 if event == "speech_start":
-                    self.is_listening = True
+                    self._flags |= _F_LISTENING
                     # Check for barge-in
-                    if self.is_speaking and self.tts_sequence is not None:
+                    if self._flags & _F_SPEAKING and self.tts_sequence is not None:
                         await self.handle_barge_in()
                     
                     # Send status update
-                    status_msg = create_status_message("listening")
-                    await self.send_message(status_msg.dict())
+                    self.queue_status("listening")
                 
                 elif event == "speech_end":
-                    self.is_listening = False
+                    self._flags &= ~_F_LISTENING
                     # Generate final transcript
                     await self.generate_final_transcript()
                     
                     # Send status update
-                    status_msg = create_status_message("processing")
-                    await self.send_message(status_msg.dict())
+                    self.queue_status("processing")
             
-            # Generate partial transcripts during speech
-            if self.vad.is_speaking() and len(self.audio_buffer) > 16000:  # ~1 second
-                await self.generate_partial_transcript()
+            # Generate partial transcripts during speech, at most once per interval
+            if self.vad.is_speaking() and self.buffered_bytes > 16000:  # ~1 second
+                now = time.monotonic()
+                if now - self._last_partial_mono >= PARTIAL_TRANSCRIPT_INTERVAL_S:
+                    self._last_partial_mono = now
+                    await self.generate_partial_transcript()
         
         except Exception as e:
-            logger.error(f"Session {self.session_id}: Error handling audio: {e}")
+            logger.error("Session %d: Error handling audio: %s", self.session_id, e)
             error_msg = create_error_message(
                 "audio_processing_error",
                 f"Failed to process audio: {str(e)}"
             )
-            await self.send_message(error_msg.dict())
+            self.queue_message(error_msg)
     
     async def generate_partial_transcript(self):
-        """Generate and send partial transcript"""
+        """Generate and queue partial transcript"""
         # Stub implementation - returns placeholder text
         # In production, this would call a streaming STT service
         
-        transcript_text = f"Partial transcript... (buffer size: {len(self.audio_buffer)} bytes)"
-        
-        transcript_msg = create_transcript_message(
-            text=transcript_text,
-            is_final=False,
-            confidence=0.75
-        )
+        transcript_text = f"Partial transcript... (buffer size: {self.buffered_bytes} bytes)"
         
-        await self.send_message(transcript_msg.dict())
-        logger.debug(f"Session {self.session_id}: Sent partial transcript")
+        self.queue_transcript(transcript_text, is_final=False, confidence=0.75)
+        logger.debug("Session %d: Sent partial transcript", self.session_id)
     
     async def generate_final_transcript(self):
-        """Generate and send final transcript"""
+        """Generate and queue final transcript"""
         # Stub implementation - returns placeholder text
         # In production, this would call a final STT service
         
-        if len(self.audio_buffer) == 0:
+        if self.buffered_bytes == 0:
             return
         
         # Simulate transcription based on audio length
-        duration_sec = len(self.audio_buffer) / (16000 * 2)  # 16kHz, 16-bit
+        # (a real STT call would take b"".join(self.audio_chunks))
+        duration_sec = self.buffered_bytes / (16000 * 2)  # 16kHz, 16-bit
         transcript_text = f"This is a placeholder final transcript for {duration_sec:.1f}s of audio."
         
-        transcript_msg = create_transcript_message(
-            text=transcript_text,
-            is_final=True,
-            confidence=0.95
-        )
-        
-        await self.send_message(transcript_msg.dict())
-        logger.info(f"Session {self.session_id}: Sent final transcript ({len(transcript_text)} chars)")
+        self.queue_transcript(transcript_text, is_final=True, confidence=0.95)
+        logger.info("Session %d: Sent final transcript (%d chars)", self.session_id, len(transcript_text))
         
         # Clear buffer
-        self.audio_buffer.clear()
+        self.audio_chunks.clear()
+        self.buffered_bytes = 0
     
     async def handle_control(self, message: ControlMessage):
         """Handle control commands from client"""
         action = message.action
         
         if action == "start_listening":
-            self.is_listening = True
+            self._flags |= _F_LISTENING
             self.vad.reset()
-            status_msg = create_status_message("listening")
-            await self.send_message(status_msg.dict())
-            logger.debug(f"Session {self.session_id}: Started listening")
+            self.queue_status("listening")
+            logger.debug("Session %d: Started listening", self.session_id)
         
         elif action == "stop_listening":
-            self.is_listening = False
+            self._flags &= ~_F_LISTENING
             if self.vad.is_speaking():
                 await self.generate_final_transcript()
             self.vad.reset()
-            status_msg = create_status_message("connected")
-            await self.send_message(status_msg.dict())
-            logger.debug(f"Session {self.session_id}: Stopped listening")
+            self.queue_status("connected")
+            logger.debug("Session %d: Stopped listening", self.session_id)
         
         elif action == "cancel_tts":
-            if self.is_speaking and self.tts_sequence is not None:
+            if self._flags & _F_SPEAKING and self.tts_sequence is not None:
                 await self.handle_barge_in()
-            logger.debug(f"Session {self.session_id}: TTS cancelled by user")
+            logger.debug("Session %d: TTS cancelled by user", self.session_id)
     
     async def handle_barge_in(self):
         """Handle barge-in (user interrupts TTS)"""
@@ -179,44 +312,38 @@ class StreamingSession:
         
         # Send barge-in notification
         barge_in_msg = create_barge_in_message(self.tts_sequence)
-        await self.send_message(barge_in_msg.dict())
+        self.queue_message(barge_in_msg)
         
-        # Reset TTS state
-        self.is_speaking = False
+        # Reset TTS state and resume listening
+        self._flags = (self._flags & ~_F_SPEAKING) | _F_LISTENING
         self.tts_sequence = None
+        self.queue_status("listening")
         
-        # Resume listening
-        self.is_listening = True
-        status_msg = create_status_message("listening")
-        await self.send_message(status_msg.dict())
-        
-        logger.info(f"Session {self.session_id}: Barge-in detected, TTS cancelled")
+        logger.info("Session %d: Barge-in detected, TTS cancelled", self.session_id)
     
     async def start_tts_playback(self, sequence: int):
         """Start TTS playback (called by orchestrator)"""
-        self.is_speaking = True
+        self._flags |= _F_SPEAKING
         self.tts_sequence = sequence
-        status_msg = create_status_message("speaking")
-        await self.send_message(status_msg.dict())
-        logger.debug(f"Session {self.session_id}: TTS playback started (seq={sequence})")
+        await self.send_status("speaking")
+        logger.debug("Session %d: TTS playback started (seq=%d)", self.session_id, sequence)
     
     async def end_tts_playback(self):
         """End TTS playback"""
-        self.is_speaking = False
+        self._flags &= ~_F_SPEAKING
         self.tts_sequence = None
-        status_msg = create_status_message("listening")
-        await self.send_message(status_msg.dict())
-        logger.debug(f"Session {self.session_id}: TTS playback ended")
+        await self.send_status("listening")
+        logger.debug("Session %d: TTS playback ended", self.session_id)
     
     def get_session_info(self) -> dict:
         """Get session information for monitoring"""
         return {
-            "session_id": self.session_id,
+            "session_id": f"session-{self.session_id}",
             "is_listening": self.is_listening,
             "is_speaking": self.is_speaking,
             "vad_state": self.vad.get_state(),
-            "buffer_size": len(self.audio_buffer),
-            "uptime_seconds": (datetime.now() - self.start_time).total_seconds(),
+            "buffer_size": self.buffered_bytes,
+            "uptime_seconds": time.monotonic() - self.start_monotonic,
         }
 
 
@@ -226,36 +353,52 @@ class WebSocketManager:
     """
     
     def __init__(self):
-        self.sessions: dict[str, StreamingSession] = {}
+        # Sessions live in list slots; slots of removed sessions are kept on
+        # a free-list and reused. Session IDs come from a counter and are
+        # never reused, so logs and correlation IDs stay unambiguous
+        self.sessions: list[Optional[StreamingSession]] = []
+        self._free_slots: list[int] = []
+        self._count = 0
         self.session_counter = 0
         logger.info("WebSocket manager initialized")
     
     def create_session(self, websocket: WebSocket) -> StreamingSession:
         """Create a new streaming session"""
         self.session_counter += 1
-        session_id = f"session-{self.session_counter}"
-        session = StreamingSession(websocket, session_id)
-        self.sessions[session_id] = session
-        logger.info(f"Created session {session_id} (total: {len(self.sessions)})")
+        session = StreamingSession(websocket, self.session_counter)
+        if self._free_slots:
+            session.slot = self._free_slots.pop()
+            self.sessions[session.slot] = session
+        else:
+            session.slot = len(self.sessions)
+            self.sessions.append(session)
+        self._count += 1
+        logger.info("Created session %d (total: %d)", session.session_id, self._count)
         return session
     
-    def remove_session(self, session_id: str):
+    def remove_session(self, session: StreamingSession):
         """Remove a streaming session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-            logger.info(f"Removed session {session_id} (total: {len(self.sessions)})")
+        slot = session.slot
+        if 0 <= slot < len(self.sessions) and self.sessions[slot] is session:
+            self.sessions[slot] = None
+            self._free_slots.append(slot)
+            self._count -= 1
+            logger.info("Removed session %d (total: %d)", session.session_id, self._count)
     
-    def get_session(self, session_id: str) -> Optional[StreamingSession]:
+    def get_session(self, session_id: int) -> Optional[StreamingSession]:
         """Get a session by ID"""
-        return self.sessions.get(session_id)
+        for session in self.sessions:
+            if session is not None and session.session_id == session_id:
+                return session
+        return None
     
     def get_all_sessions(self) -> list[StreamingSession]:
         """Get all active sessions"""
-        return list(self.sessions.values())
+        return [session for session in self.sessions if session is not None]
     
     def get_session_count(self) -> int:
         """Get number of active sessions"""
-        return len(self.sessions)
+        return self._count
 
 
 # Global WebSocket manager instance
@@ -266,6 +409,23 @@ ws_manager = WebSocketManager()
 # WebSocket Endpoint Handler
 # ============================================================================
 
+async def _dispatch_audio(session: StreamingSession, data: dict):
+    # JSON audio is the hot path: decode the payload from the raw dict
+    # without building a pydantic model
+    await session.handle_audio(decode_audio_payload(data))
+
+
+async def _dispatch_control(session: StreamingSession, data: dict):
+    await session.handle_control(parse_client_message(data))
+
+
+# Text message handlers keyed by the message "type" field
+_TEXT_HANDLERS = {
+    "audio": _dispatch_audio,
+    "control": _dispatch_control,
+}
+
+
 async def handle_websocket_stream(websocket: WebSocket):
     """
     Main WebSocket endpoint handler
@@ -277,28 +437,35 @@ async def handle_websocket_stream(websocket: WebSocket):
     
     # Create session
     session = ws_manager.create_session(websocket)
+    session.start()
     
     try:
         # Send connection confirmation
-        status_msg = create_status_message("connected")
-        await session.send_message(status_msg.dict())
+        await session.send_status("connected")
         
-        # Message loop
-        while True:
-            # Receive message
-            data = await websocket.receive_json()
+        # Message loop (ends early if the writer lost the connection)
+        while not session.closed:
+            # Wait for the writer if the client is not keeping up
+            if session.queued_bytes > SEND_QUEUE_HIGH_WATER:
+                await session.drain()
+            
+            # Receive message (text: JSON, bytes: binary audio frame)
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
             
             try:
-                # Parse message
-                message = parse_client_message(data)
+                if received.get("bytes") is not None:
+                    # Binary audio goes straight to audio handling
+                    await session.handle_audio(parse_audio_frame(received["bytes"]).pcm)
+                    continue
                 
-                # Route message
-                if isinstance(message, AudioInputMessage):
-                    await session.handle_audio_input(message)
-                elif isinstance(message, ControlMessage):
-                    await session.handle_control(message)
-                else:
-                    logger.warning(f"Session {session.session_id}: Unknown message type")
+                # Route message by type
+                data = orjson.loads(received["text"])
+                handler = _TEXT_HANDLERS.get(data.get("type"))
+                if handler is None:
+                    raise ValueError(f"Unknown message type: {data.get('type')}")
+                await handler(session, data)
             
             except ValueError as e:
                 # Invalid message format
@@ -306,27 +473,28 @@ async def handle_websocket_stream(websocket: WebSocket):
                     "invalid_message",
                     f"Invalid message format: {str(e)}"
                 )
-                await session.send_message(error_msg.dict())
+                await session.send_message(error_msg)
             
             except Exception as e:
                 # Processing error
-                logger.error(f"Session {session.session_id}: Error processing message: {e}")
+                logger.error("Session %d: Error processing message: %s", session.session_id, e)
                 error_msg = create_error_message(
                     "processing_error",
                     f"Error processing message: {str(e)}"
                 )
-                await session.send_message(error_msg.dict())
+                await session.send_message(error_msg)
     
     except WebSocketDisconnect:
-        logger.info(f"Session {session.session_id}: Client disconnected")
+        logger.info("Session %d: Client disconnected", session.session_id)
     
     except Exception as e:
-        logger.error(f"Session {session.session_id}: Unexpected error: {e}")
+        logger.error("Session %d: Unexpected error: %s", session.session_id, e)
     
     finally:
         # Cleanup
-        ws_manager.remove_session(session.session_id)
-        logger.info(f"Session {session.session_id}: Cleaned up")
+        await session.close()
+        ws_manager.remove_session(session)
+        logger.info("Session %d: Cleaned up", session.session_id)
 
 
 # ============================================================================
@@ -0,0 +1,12 @@
+"""
+Shared test fixtures
+"""
+
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def rng():
+    """Seeded random generator so audio-based tests are deterministic"""
+    return np.random.default_rng(0)
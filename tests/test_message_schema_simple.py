@@ -2,6 +2,7 @@
 Simple tests for WebSocket message schema
 """
 
+import json
 import pytest
 import sys
 import os
@@ -15,6 +16,12 @@ from message_schema import (
     create_error_message,
     create_vad_event,
     create_status_message,
+    create_audio_frame,
+    decode_audio_payload,
+    parse_audio_frame,
+    serialize_message,
+    serialize_status_message,
+    serialize_transcript_message,
     validate_audio_data
 )
 
@@ -32,7 +39,7 @@ class TestClientMessageParsing:
         }
         parsed = parse_client_message(msg)
         assert parsed.type == "audio"
-        assert parsed.data == "dGVzdA=="
+        assert parsed.data == b"test"
         assert parsed.sequence == 1
     
     def test_parse_control_message(self):
@@ -52,6 +59,43 @@ class TestClientMessageParsing:
             parse_client_message(msg)
 
 
+class TestAudioFrameParsing:
+    """Tests for binary audio frame parsing"""
+    
+    def test_parse_audio_frame(self):
+        """Test parsing a binary audio frame"""
+        frame = create_audio_frame(b"\x01\x00\x02\x00", sequence=7, timestamp=1234567890)
+        parsed = parse_audio_frame(frame)
+        assert parsed.sequence == 7
+        assert parsed.timestamp == 1234567890
+        assert bytes(parsed.pcm) == b"\x01\x00\x02\x00"
+    
+    def test_parse_short_frame_raises_error(self):
+        """Test that a frame shorter than the header raises error"""
+        with pytest.raises(ValueError, match="too short"):
+            parse_audio_frame(b"\x01\x00")
+    
+    def test_parse_unknown_tag_raises_error(self):
+        """Test that an unknown frame tag raises error"""
+        frame = create_audio_frame(b"", sequence=1, timestamp=0)
+        with pytest.raises(ValueError, match="Unknown binary frame tag"):
+            parse_audio_frame(b"\x09" + frame[1:])
+
+
+class TestAudioPayloadDecoding:
+    """Tests for raw audio message decoding"""
+    
+    def test_decode_audio_payload(self):
+        """Test decoding audio from a raw message dict"""
+        msg = {"type": "audio", "data": "dGVzdA==", "timestamp": 0, "sequence": 1}
+        assert decode_audio_payload(msg) == b"test"
+    
+    def test_decode_missing_data_raises_error(self):
+        """Test that a missing data field raises error"""
+        with pytest.raises(ValueError):
+            decode_audio_payload({"type": "audio"})
+
+
 class TestServerMessageCreation:
     """Tests for server message creation"""
     
@@ -100,6 +144,23 @@ class TestServerMessageCreation:
         """Test creating status message"""
         msg = create_status_message("listening")
         assert msg.status == "listening"
+    
+    def test_serialize_status_matches_model(self):
+        """Test that pre-serialized status matches the model's JSON"""
+        fast = json.loads(serialize_status_message("processing"))
+        model = json.loads(serialize_message(create_status_message("processing")))
+        assert fast.pop("timestamp") > 0
+        model.pop("timestamp")
+        assert fast == model
+    
+    def test_serialize_transcript_matches_model(self):
+        """Test that templated transcript matches the model's JSON"""
+        text = 'say "hi" \u2014 now'
+        fast = json.loads(serialize_transcript_message(text, is_final=False, confidence=0.75))
+        model = json.loads(serialize_message(create_transcript_message(text, is_final=False, confidence=0.75)))
+        assert fast.pop("timestamp") > 0
+        model.pop("timestamp")
+        assert fast == model
 
 
 class TestAudioValidation:
@@ -116,3 +177,12 @@ class TestAudioValidation:
     def test_validate_empty_audio(self):
         """Test validating empty audio"""
         assert validate_audio_data("") is False
+    
+    def test_validate_unpadded_base64(self):
+        """Test that base64 with a length not divisible by 4 is rejected"""
+        assert validate_audio_data("dGVzdA") is False
+    
+    def test_validate_oversized_audio(self):
+        """Test that audio larger than 1MB is rejected"""
+        oversized = "A" * (4 * (1024 * 1024 // 3 + 1))
+        assert validate_audio_data(oversized) is False
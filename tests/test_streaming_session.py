@@ -0,0 +1,242 @@
+"""
+Tests for StreamingSession outbound messaging
+"""
+
+import pytest
+import asyncio
+import json
+import sys
+import os
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import websocket_handler
+from websocket_handler import StreamingSession, WebSocketManager, handle_websocket_stream, ws_manager
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a FastAPI WebSocket"""
+    
+    def __init__(self, messages=(), fail_sends=False, hang_sends=False):
+        self.incoming = list(messages)
+        self.received = 0
+        self.sent = []
+        self.closed = False
+        self.fail_sends = fail_sends
+        self.hang_sends = hang_sends
+    
+    async def accept(self):
+        pass
+    
+    async def receive(self):
+        await asyncio.sleep(0)
+        if self.closed or not self.incoming:
+            return {"type": "websocket.disconnect", "code": 1000}
+        self.received += 1
+        return self.incoming.pop(0)
+    
+    async def send_text(self, text):
+        if self.fail_sends:
+            raise RuntimeError("connection lost")
+        if self.hang_sends:
+            # A client that never reads: the send never completes
+            await asyncio.get_running_loop().create_future()
+        self.sent.append(text)
+    
+    async def close(self, code=1000):
+        self.closed = True
+
+
+async def wait_for(condition):
+    """Yield to the event loop until condition() holds"""
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition not reached")
+
+
+class TestSessionWriter:
+    """Tests for the per-session writer task"""
+    
+    @pytest.mark.asyncio
+    async def test_queued_messages_coalesce_in_order(self):
+        """Test that messages queued together go out as one ordered batch"""
+        ws = FakeWebSocket()
+        session = StreamingSession(ws, 0)
+        session.start()
+        
+        session.queue_status("listening")
+        session.queue_transcript("hello", is_final=False, confidence=0.75)
+        session.queue_status("processing")
+        await wait_for(lambda: ws.sent)
+        
+        assert len(ws.sent) == 1
+        batch = json.loads(ws.sent[0])
+        assert batch["type"] == "batch"
+        assert [m["type"] for m in batch["messages"]] == ["status", "transcript", "status"]
+        assert batch["messages"][0]["status"] == "listening"
+        assert batch["messages"][1]["text"] == "hello"
+        assert batch["messages"][2]["status"] == "processing"
+        
+        # A lone message is sent unwrapped
+        session.queue_status("connected")
+        await wait_for(lambda: len(ws.sent) == 2)
+        single = json.loads(ws.sent[1])
+        assert single["type"] == "status"
+        assert single["status"] == "connected"
+        
+        await session.close()
+    
+    @pytest.mark.asyncio
+    async def test_failed_send_stops_queueing(self):
+        """Test that a failed send closes the socket and drops later messages"""
+        ws = FakeWebSocket(fail_sends=True)
+        session = StreamingSession(ws, 0)
+        session.start()
+        
+        session.queue_status("listening")
+        await wait_for(lambda: session.closed)
+        
+        for _ in range(10):
+            session.queue_status("processing")
+        
+        assert ws.closed is True
+        assert len(session._send_queue) == 0
+        await session.close()
+    
+    @pytest.mark.asyncio
+    async def test_failed_send_ends_stream(self):
+        """Test that the receive loop exits once the writer has failed"""
+        control = json.dumps({"type": "control", "action": "start_listening"})
+        messages = [{"type": "websocket.receive", "text": control} for _ in range(51)]
+        ws = FakeWebSocket(messages, fail_sends=True)
+        sessions_before = ws_manager.get_session_count()
+        
+        await asyncio.wait_for(handle_websocket_stream(ws), timeout=1)
+        
+        assert ws.closed is True
+        assert ws.received < 51
+        assert ws_manager.get_session_count() == sessions_before
+    
+    @pytest.mark.asyncio
+    async def test_stalled_client_stops_receive_loop(self, monkeypatch):
+        """Test that the receive loop waits once the send backlog passes the high-water mark"""
+        monkeypatch.setattr(websocket_handler, "SEND_QUEUE_HIGH_WATER", 4096)
+        messages = [{"type": "websocket.receive", "text": "not json"} for _ in range(20000)]
+        ws = FakeWebSocket(messages, hang_sends=True)
+        sessions_before = ws_manager.get_session_count()
+        
+        task = asyncio.create_task(handle_websocket_stream(ws))
+        for _ in range(1000):
+            await asyncio.sleep(0)
+        session = ws_manager.get_all_sessions()[-1]
+        
+        # Every malformed frame queues an error reply; the loop stops
+        # reading once the replies exceed the mark
+        assert session.queued_bytes > 4096
+        assert session.queued_bytes < 4096 + 1024
+        received = ws.received
+        assert received < 100
+        for _ in range(100):
+            await asyncio.sleep(0)
+        assert ws.received == received
+        
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert ws_manager.get_session_count() == sessions_before
+
+
+def queued(session, type_):
+    """Queued (unsent) messages of one type, oldest first"""
+    messages = [json.loads(payload) for payload in session._send_queue]
+    return [m for m in messages if m["type"] == type_]
+
+
+class TestHandleAudio:
+    """Tests for StreamingSession.handle_audio"""
+    
+    @pytest.mark.asyncio
+    async def test_partial_transcripts_throttled(self, monkeypatch, rng):
+        """Test that partial transcripts go out at most once per interval"""
+        clock = [100.0]
+        monkeypatch.setattr(websocket_handler.time, "monotonic", lambda: clock[0])
+        session = StreamingSession(FakeWebSocket(), 1)
+        loud = rng.integers(-10000, 10000, 1600, dtype=np.int16).tobytes()
+        
+        # Speak until the first partial goes out (speech plus ~1s buffered)
+        for _ in range(20):
+            await session.handle_audio(loud)
+            if queued(session, "transcript"):
+                break
+        assert len(queued(session, "transcript")) == 1
+        
+        # More speech inside the interval sends nothing new
+        for elapsed in (0.0, 0.1, 0.2):
+            clock[0] = 100.0 + elapsed
+            await session.handle_audio(loud)
+        assert len(queued(session, "transcript")) == 1
+        
+        clock[0] = 100.0 + websocket_handler.PARTIAL_TRANSCRIPT_INTERVAL_S
+        await session.handle_audio(loud)
+        partials = queued(session, "transcript")
+        assert len(partials) == 2
+        assert not any(m["is_final"] for m in partials)
+        assert not queued(session, "error")
+    
+    @pytest.mark.asyncio
+    async def test_utterance_buffer_capped(self, rng):
+        """Test that the oldest audio is dropped past MAX_UTTERANCE_BYTES"""
+        session = StreamingSession(FakeWebSocket(), 1)
+        cap = websocket_handler.MAX_UTTERANCE_BYTES
+        
+        # Continuous speech never ends the utterance, so only the cap trims it
+        for _ in range(cap // 3200 + 50):
+            chunk = rng.integers(-10000, 10000, 1600, dtype=np.int16).tobytes()
+            await session.handle_audio(chunk)
+            assert session.buffered_bytes <= cap
+            assert session.audio_chunks[-1] is chunk
+        
+        assert session.vad.is_speaking()
+        assert session.buffered_bytes == sum(len(c) for c in session.audio_chunks)
+        assert session.buffered_bytes > cap - 3200
+        
+        # A chunk larger than the cap is still kept, on its own
+        big = rng.integers(-10000, 10000, cap // 2 + 1600, dtype=np.int16).tobytes()
+        await session.handle_audio(big)
+        assert list(session.audio_chunks) == [big]
+        assert session.buffered_bytes == len(big)
+        assert not queued(session, "error")
+
+
+class TestWebSocketManager:
+    """Tests for session bookkeeping"""
+    
+    def test_slots_reused_ids_not(self):
+        """Test that removed slots are reused while session IDs keep increasing"""
+        manager = WebSocketManager()
+        first = manager.create_session(FakeWebSocket())
+        second = manager.create_session(FakeWebSocket())
+        assert manager.get_session_count() == 2
+        
+        manager.remove_session(first)
+        assert manager.get_session_count() == 1
+        assert manager.get_session(first.session_id) is None
+        
+        third = manager.create_session(FakeWebSocket())
+        assert third.slot == first.slot
+        assert first.session_id < second.session_id < third.session_id
+        assert manager.get_session_count() == 2
+        assert manager.get_session(third.session_id) is third
+        assert manager.get_all_sessions() == [third, second]
+        assert third.get_session_info()["session_id"] == f"session-{third.session_id}"
+        
+        # Removing a session twice does not free its slot again
+        manager.remove_session(first)
+        manager.remove_session(third)
+        manager.remove_session(third)
+        assert manager.get_session_count() == 1
+        assert manager.get_all_sessions() == [second]